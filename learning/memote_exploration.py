@@ -42,13 +42,17 @@ def main():
     
     print("\n--- Basic Model Checks ---")
     
-    reactions_with_genes = sum(1 for r in model.reactions if r.genes)
+    # Single pass over reactions for both gene and annotation coverage
+    reactions_with_genes = 0
+    reactions_with_annotation = 0
+    for r in model.reactions:
+        reactions_with_genes += bool(r.genes)
+        reactions_with_annotation += bool(r.annotation)
     print(f"Reactions with genes: {reactions_with_genes}/{len(model.reactions)}")
     
     metabolites_with_formula = sum(1 for m in model.metabolites if m.formula)
     print(f"Metabolites with formula: {metabolites_with_formula}/{len(model.metabolites)}")
     
-    reactions_with_annotation = sum(1 for r in model.reactions if r.annotation)
     print(f"Reactions with annotations: {reactions_with_annotation}/{len(model.reactions)}")
     
     print("\n✓ Exploration complete!")
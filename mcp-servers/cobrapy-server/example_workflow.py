@@ -9,31 +9,129 @@ Date: 2026-01-28
 
 import requests
 import json
+import time
+from dataclasses import dataclass
+import msgpack
+import numpy as np
 
 BASE_URL = "http://localhost:5001"
+REQUEST_TIMEOUT = 60  # seconds; genome-scale FVA can be slow
+
+
+@dataclass(slots=True)
+class GrowthAnalysis:
+    """Result of COBRApyAgent.analyze_model_growth"""
+    model: str
+    num_reactions: int
+    num_metabolites: int
+    num_genes: int
+    objective_value: float
+    status: str
+
+
+@dataclass(slots=True)
+class EssentialityResult:
+    """Result of COBRApyAgent.find_essential_genes"""
+    essential_genes: list
+    non_essential_genes: list
+    tested: int
+
+
+@dataclass(slots=True)
+class ReactionVariability:
+    """Result of COBRApyAgent.analyze_reaction_variability"""
+    flexible_reactions: int
+    blocked_reactions: int
+    fixed_reactions: int
+    total: int
+    examples: dict
+
+
+def _unpack_ndarray(obj):
+    """msgpack hook: rebuild NumPy arrays sent as raw bytes (zero-copy)"""
+    if obj.get("__ndarray__"):
+        return np.frombuffer(obj["data"], dtype=obj["dtype"]).reshape(obj["shape"])
+    return obj
 
 class COBRApyAgent:
     """Simple agent that interacts with COBRApy MCP server"""
     
-    def __init__(self, base_url=BASE_URL):
+    def __init__(self, base_url=BASE_URL, use_msgpack=False):
         self.base_url = base_url
+        self.use_msgpack = use_msgpack
         self.loaded_models = set()
+        
+        # Keep-alive session: workflows reuse one pooled connection per call
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
     
     def call_tool(self, tool_name, params):
         """Call a tool on the MCP server"""
-        response = requests.post(
+        if self.use_msgpack:
+            # Binary transport: smaller payloads, FVA arrays arrive as raw float32
+            response = self.session.post(
+                f"{self.base_url}/rpc",
+                data=msgpack.packb({"tool": tool_name, "params": params}),
+                headers={"Content-Type": "application/msgpack"},
+                timeout=REQUEST_TIMEOUT
+            )
+            return msgpack.unpackb(response.content, object_hook=_unpack_ndarray)
+        
+        response = self.session.post(
             f"{self.base_url}/tools/{tool_name}",
-            json=params
+            json=params,
+            timeout=REQUEST_TIMEOUT
         )
         return response.json()
     
+    def stream_fva(self, model_id, **params):
+        """Yield FVA rows one at a time from the streaming (NDJSON) endpoint"""
+        with self.session.post(
+            f"{self.base_url}/tools/run_fva",
+            json={"model_id": model_id, "stream": True, **params},
+            stream=True,
+            timeout=REQUEST_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    
     def load_model(self, model_id):
         """Load a metabolic model"""
         result = self.call_tool("load_model", {"model_id": model_id})
-        if result["success"]:
+        if result.get("success"):
             self.loaded_models.add(model_id)
         return result
     
+    def load_model_background(self, model_id, model_path=None, poll_interval=0.5):
+        """Load a (large) model as a background job and wait for it"""
+        params = {"model_id": model_id, "background": True}
+        if model_path:
+            params["model_path"] = model_path
+        job = self.call_tool("load_model", params)
+        if "job_id" not in job:
+            return job
+        
+        while True:
+            response = self.session.get(f"{self.base_url}/jobs/{job['job_id']}",
+                                        timeout=REQUEST_TIMEOUT)
+            status = response.json()
+            if status.get("status") != "pending":
+                break
+            time.sleep(poll_interval)
+        
+        # A 404 means the job expired, or the poll reached a worker that never saw it
+        if status.get("status") not in ("done", "failed"):
+            raise RuntimeError(f"Job {job['job_id']} lost: "
+                               f"{status.get('error', response.status_code)}")
+        
+        if status.get("status") == "done":
+            self.loaded_models.add(model_id)
+        return status
+    
     def analyze_model_growth(self, model_id):
         """Analyze model growth potential"""
         # Ensure model is loaded
@@ -46,88 +144,81 @@ class COBRApyAgent:
         # Run optimization
         fba = self.call_tool("optimize_model", {"model_id": model_id})
         
-        return {
-            "model": model_id,
-            "num_reactions": stats["result"]["num_reactions"],
-            "num_metabolites": stats["result"]["num_metabolites"],
-            "num_genes": stats["result"]["num_genes"],
-            "objective_value": fba["result"]["objective_value"],
-            "status": fba["result"]["status"]
-        }
+        return GrowthAnalysis(
+            model=model_id,
+            num_reactions=stats["statistics"]["reactions"],
+            num_metabolites=stats["statistics"]["metabolites"],
+            num_genes=stats["statistics"]["genes"],
+            objective_value=fba["objective_value"],
+            status=fba["status"]
+        )
     
     def find_essential_genes(self, model_id, sample_genes=None):
         """Test gene essentiality"""
         if model_id not in self.loaded_models:
             self.load_model(model_id)
         
-        # Get model genes
-        stats = self.call_tool("get_model_stats", {"model_id": model_id})
-        all_genes = stats["result"]["genes"]
-        
         # Sample some genes to test
-        test_genes = sample_genes or all_genes[:5]
+        test_genes = sample_genes
+        if not test_genes:
+            stats = self.call_tool("get_model_stats", {"model_id": model_id})
+            test_genes = stats["gene_ids"][:5]
         
         essential = []
         non_essential = []
         
-        for gene in test_genes:
-            result = self.call_tool("gene_knockout", {
-                "model_id": model_id,
-                "gene_id": gene
-            })
-            
-            if result["success"]:
-                growth_rate = result["result"]["knockout_growth_rate"]
-                if growth_rate < 0.01:  # Essentially zero
+        # One request covers every knockout
+        result = self.call_tool("batch_gene_knockout", {
+            "model_id": model_id,
+            "gene_ids": test_genes
+        })
+        
+        if result.get("success"):
+            for gene, knockout in result["results"].items():
+                if knockout["knockout_growth"] < 0.01:  # Essentially zero
                     essential.append(gene)
                 else:
                     non_essential.append(gene)
         
-        return {
-            "essential_genes": essential,
-            "non_essential_genes": non_essential,
-            "tested": len(test_genes)
-        }
+        return EssentialityResult(
+            essential_genes=essential,
+            non_essential_genes=non_essential,
+            tested=len(test_genes)
+        )
     
     def analyze_reaction_variability(self, model_id):
-        """Run FVA to find flexible reactions"""
+        """Run FVA to find flexible reactions; raises RuntimeError if FVA fails"""
         if model_id not in self.loaded_models:
             self.load_model(model_id)
         
         fva_result = self.call_tool("run_fva", {"model_id": model_id})
         
-        if not fva_result["success"]:
-            return {"error": "FVA failed"}
-        
-        # Analyze variability
-        reactions = fva_result["result"]["reactions"]
-        
-        flexible = []
-        blocked = []
-        fixed = []
-        
-        for rxn_id, bounds in reactions.items():
-            min_flux = bounds["minimum"]
-            max_flux = bounds["maximum"]
-            
-            # Classify based on flux ranges
-            if abs(min_flux) < 1e-6 and abs(max_flux) < 1e-6:
-                blocked.append(rxn_id)
-            elif abs(max_flux - min_flux) < 1e-6:
-                fixed.append(rxn_id)
-            else:
-                flexible.append(rxn_id)
-        
-        return {
-            "flexible_reactions": len(flexible),
-            "blocked_reactions": len(blocked),
-            "fixed_reactions": len(fixed),
-            "total": len(reactions),
-            "examples": {
-                "flexible": flexible[:5],
-                "blocked": blocked[:5]
+        if not fva_result.get("success"):
+            raise RuntimeError(f"FVA failed: {fva_result.get('error', 'unknown error')}")
+        
+        # Analyze variability (results arrive as parallel ids/minimum/maximum arrays)
+        reactions = fva_result["results"]
+        
+        ids = np.array(reactions["ids"])
+        min_flux = np.asarray(reactions["minimum"], dtype=np.float64)
+        max_flux = np.asarray(reactions["maximum"], dtype=np.float64)
+        
+        # Classify based on flux ranges. Bounds arrive rounded to float32, whose
+        # spacing exceeds 1e-6 above |flux| ~8, so "fixed" needs a relative tolerance
+        blocked = (np.abs(min_flux) < 1e-6) & (np.abs(max_flux) < 1e-6)
+        fixed = np.isclose(max_flux, min_flux, rtol=1e-6, atol=1e-6) & ~blocked
+        flexible = ~(blocked | fixed)
+        
+        return ReactionVariability(
+            flexible_reactions=int(flexible.sum()),
+            blocked_reactions=int(blocked.sum()),
+            fixed_reactions=int(fixed.sum()),
+            total=len(ids),
+            examples={
+                "flexible": ids[flexible][:5].tolist(),
+                "blocked": ids[blocked][:5].tolist()
             }
-        }
+        )
 
 
 def workflow_1_basic_analysis():
@@ -140,15 +231,15 @@ def workflow_1_basic_analysis():
     
     print("\n1. Loading E. coli textbook model...")
     load_result = agent.load_model("textbook")
-    print(f"   Status: {load_result['message']}")
+    print(f"   Loaded: {load_result['model_id']} ({load_result['reactions']} reactions)")
     
     print("\n2. Analyzing growth potential...")
     analysis = agent.analyze_model_growth("textbook")
-    print(f"   Model size: {analysis['num_reactions']} reactions, "
-          f"{analysis['num_metabolites']} metabolites, "
-          f"{analysis['num_genes']} genes")
-    print(f"   Growth rate: {analysis['objective_value']:.3f} /h")
-    print(f"   Status: {analysis['status']}")
+    print(f"   Model size: {analysis.num_reactions} reactions, "
+          f"{analysis.num_metabolites} metabolites, "
+          f"{analysis.num_genes} genes")
+    print(f"   Growth rate: {analysis.objective_value:.3f} /h")
+    print(f"   Status: {analysis.status}")
 
 
 def workflow_2_gene_essentiality():
@@ -163,13 +254,13 @@ def workflow_2_gene_essentiality():
     test_genes = ["b0008", "b0116", "b0118", "b0720", "b0721"]
     results = agent.find_essential_genes("textbook", test_genes)
     
-    print(f"\n   Tested {results['tested']} genes:")
-    print(f"   Essential: {len(results['essential_genes'])} genes")
-    if results['essential_genes']:
-        print(f"      {', '.join(results['essential_genes'])}")
-    print(f"   Non-essential: {len(results['non_essential_genes'])} genes")
-    if results['non_essential_genes']:
-        print(f"      {', '.join(results['non_essential_genes'])}")
+    print(f"\n   Tested {results.tested} genes:")
+    print(f"   Essential: {len(results.essential_genes)} genes")
+    if results.essential_genes:
+        print(f"      {', '.join(results.essential_genes)}")
+    print(f"   Non-essential: {len(results.non_essential_genes)} genes")
+    if results.non_essential_genes:
+        print(f"      {', '.join(results.non_essential_genes)}")
 
 
 def workflow_3_reaction_analysis():
@@ -183,17 +274,17 @@ def workflow_3_reaction_analysis():
     print("\n1. Running Flux Variability Analysis...")
     results = agent.analyze_reaction_variability("textbook")
     
-    print(f"\n   Total reactions: {results['total']}")
-    print(f"   Flexible: {results['flexible_reactions']} "
-          f"({100*results['flexible_reactions']/results['total']:.1f}%)")
-    print(f"   Blocked: {results['blocked_reactions']} "
-          f"({100*results['blocked_reactions']/results['total']:.1f}%)")
-    print(f"   Fixed: {results['fixed_reactions']} "
-          f"({100*results['fixed_reactions']/results['total']:.1f}%)")
+    print(f"\n   Total reactions: {results.total}")
+    print(f"   Flexible: {results.flexible_reactions} "
+          f"({100*results.flexible_reactions/results.total:.1f}%)")
+    print(f"   Blocked: {results.blocked_reactions} "
+          f"({100*results.blocked_reactions/results.total:.1f}%)")
+    print(f"   Fixed: {results.fixed_reactions} "
+          f"({100*results.fixed_reactions/results.total:.1f}%)")
     
-    if results['examples']['flexible']:
+    if results.examples['flexible']:
         print(f"\n   Example flexible reactions:")
-        for rxn in results['examples']['flexible']:
+        for rxn in results.examples['flexible']:
             print(f"      - {rxn}")
 
 
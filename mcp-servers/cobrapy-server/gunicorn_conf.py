@@ -0,0 +1,24 @@
+"""
+Gunicorn configuration for the COBRApy MCP Server
+
+Usage: gunicorn -c gunicorn_conf.py server:app
+
+Author: Atul B Raj
+Date: 2026-01-28
+"""
+
+import os
+
+bind = os.environ.get("MCP_BIND", "0.0.0.0:5001")
+
+# One worker, scaled with threads: caches are per process (see README, Production)
+workers = int(os.environ.get("MCP_WORKERS", 1))
+worker_class = "gthread"
+threads = int(os.environ.get("MCP_THREADS", 4))
+
+# Load MCP_PRELOAD_MODELS in the master; workers share them copy-on-write
+preload_app = True
+os.environ.setdefault("MCP_PRELOAD_MODELS", "textbook,iJO1366")
+
+# FBA/FVA on genome-scale models can take a while
+timeout = 120
@@ -6,17 +6,312 @@ Author: Atul B Raj
 Date: 2026-01-28
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, stream_with_context
 import cobra
 from cobra.io import load_model, read_sbml_model
 from cobra.flux_analysis import flux_variability_analysis, single_gene_deletion
+from cobra.util.solver import interface_to_str, solvers as available_solvers
+import libsbml
+from cachetools import LRUCache, TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import msgpack
+import numpy as np
+import orjson
 import traceback
+import threading
+import uuid
+import weakref
 import os
 
 app = Flask(__name__)
 
-# In-memory model cache
-model_cache = {}
+class ModelCache(LRUCache):
+    """Bounded LRU model cache that also drops derived state on eviction.
+
+    cachetools caches are not thread-safe and LRU reads reorder entries,
+    so access is guarded for the threaded gunicorn workers. Hold ``lock``
+    to read or update a model together with its model_meta entry.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.evicted_count = 0
+        self.lock = threading.RLock()
+
+    def __getitem__(self, key):
+        with self.lock:
+            return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        with self.lock:
+            super().__delitem__(key)
+
+    def popitem(self):
+        with self.lock:
+            model_id, model = super().popitem()
+            self.evicted_count += 1
+            model_meta.pop(model_id, None)
+        clear_result_caches()
+        return model_id, model
+
+# In-memory model cache; cobra models are large (iJO1366 is ~40 MB)
+model_cache = ModelCache(maxsize=int(os.environ.get('MCP_MODEL_CACHE', 8)))
+
+# Derived per-model statistics, computed once when a model is cached
+model_meta = {}
+
+# Recently failed loads (model_path or model_id -> error), bounded and expiring
+FAILED_LOAD_TTL = 60  # seconds
+_failed_loads = TTLCache(maxsize=1024, ttl=FAILED_LOAD_TTL)
+_failed_loads_lock = threading.Lock()
+
+# Background model loads (job_id -> (model_id, Future)), bounded and expiring
+JOB_TTL = 600  # seconds
+load_executor = ThreadPoolExecutor(max_workers=2)
+load_jobs = TTLCache(maxsize=1024, ttl=JOB_TTL)
+_load_jobs_lock = threading.Lock()
+
+# Per-model LP locks, dropped once unused (concurrency: README, Production section)
+_model_locks = weakref.WeakValueDictionary()
+_model_locks_lock = threading.Lock()
+
+# Leave one core free for the request thread when fanning out FVA/deletions
+DEFAULT_PROCESSES = max(1, (os.cpu_count() or 1) - 1)
+
+# Below this many reactions/genes, starting a process pool costs more than it saves
+PARALLEL_MIN_ITEMS = 200
+
+# Fluxes are sent as float32; digits past ~7 significant figures are solver noise
+FLUX_DTYPE = np.float32
+
+# Opt-in solver for models loaded through the API (see README, "MCP_SOLVER")
+MCP_SOLVER = os.environ.get('MCP_SOLVER')
+
+def parse_processes(data, n_items):
+    """Validate the optional 'processes' field; raises ValueError if invalid"""
+    processes = data.get('processes')
+    if processes is None:
+        return DEFAULT_PROCESSES if n_items >= PARALLEL_MIN_ITEMS else 1
+    if isinstance(processes, bool) or not isinstance(processes, int) or processes < 1:
+        raise ValueError("processes must be a positive integer")
+    return processes
+
+def build_model_meta(model):
+    """Collect the statistics served by get_model_stats and /models"""
+    return {
+        "id": model.id,
+        "name": model.name,
+        "reactions": len(model.reactions),
+        "metabolites": len(model.metabolites),
+        "genes": len(model.genes),
+        "gene_ids": [g.id for g in model.genes],
+        "compartments": list(model.compartments.keys()),
+        "objective_str": str(model.objective.expression),
+        "solver": interface_to_str(model.problem)
+    }
+
+def get_cached(model_id):
+    """A cached model and its metadata, fetched together; (None, None) if not loaded"""
+    with model_cache.lock:
+        model = model_cache.get(model_id)
+        meta = model_meta.get(model_id)
+    if model is None or meta is None:
+        return None, None
+    return model, meta
+
+def model_lock(model_id):
+    """Lock guarding LP work (and bound reads) on one cached model"""
+    with _model_locks_lock:
+        return _model_locks.setdefault(model_id, threading.Lock())
+
+def select_solver(model):
+    """Switch the model to MCP_SOLVER, keeping its current solver if that one fails"""
+    if not MCP_SOLVER:
+        return
+    previous = interface_to_str(model.problem)
+    if MCP_SOLVER not in available_solvers:
+        app.logger.warning("MCP_SOLVER '%s' is not installed; using %s", MCP_SOLVER, previous)
+        return
+    try:
+        model.solver = MCP_SOLVER
+        # An infeasible model yields NaN; only solver or license errors raise
+        model.slim_optimize(error_value=float('nan'))
+    except Exception as e:
+        app.logger.warning("Solver '%s' failed for model '%s' (%s); falling back to %s",
+                           MCP_SOLVER, model.id, e, previous)
+        model.solver = previous
+
+def cache_model(model_id, model, switch_solver=True):
+    """Store a model with its precomputed statistics"""
+    if switch_solver:
+        select_solver(model)
+    meta = build_model_meta(model)
+    # Let in-flight LPs on the old model finish before clearing their results
+    with model_lock(model_id):
+        with model_cache.lock:
+            model_cache[model_id] = model
+            model_meta[model_id] = meta
+        clear_result_caches()
+    return meta
+
+def uncache_model(model_id):
+    """Remove a model and everything derived from it; False if it was not cached"""
+    with model_lock(model_id):
+        with model_cache.lock:
+            if model_cache.pop(model_id, None) is None:
+                return False
+            model_meta.pop(model_id, None)
+        clear_result_caches()
+    return True
+
+def read_model(model_id, model_path=None):
+    """Read an SBML file, or fetch a built-in/repository model by id.
+
+    Failures are remembered in _failed_loads for FAILED_LOAD_TTL seconds.
+    """
+    source = model_path or model_id
+    try:
+        model = read_sbml_model(model_path) if model_path else load_model(model_id)
+    except Exception as e:
+        with _failed_loads_lock:
+            _failed_loads[source] = str(e)
+        raise
+    with _failed_loads_lock:
+        _failed_loads.pop(source, None)
+    return model
+
+def load_and_cache(model_id, model_path=None):
+    """Background job body: read a model and add it to the cache"""
+    cache_model(model_id, read_model(model_id, model_path))
+
+def preload_models(model_ids):
+    """Load built-in models into the cache at import time.
+
+    Under gunicorn with preload_app this runs once in the master process,
+    so forked workers share the model pages copy-on-write.
+    """
+    for model_id in model_ids:
+        model_id = model_id.strip()
+        if model_id and model_id not in model_cache:
+            # One unavailable model must not keep the server from starting
+            try:
+                # Keep the default solver; see README on MCP_SOLVER and fork safety
+                cache_model(model_id, load_model(model_id), switch_solver=False)
+            except Exception as e:
+                app.logger.warning("Could not preload model '%s': %s", model_id, e)
+
+# ============================================================================
+# Result Caching
+# ============================================================================
+
+def bounds_fingerprint(model):
+    """Hash of all reaction bounds; identifies the LP a model currently defines"""
+    return hash(tuple((r.id, r.lower_bound, r.upper_bound) for r in model.reactions))
+
+class Unkeyed:
+    """Argument passed through lru_cache without becoming part of the cache key"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return 0
+
+    def __eq__(self, other):
+        return isinstance(other, Unkeyed)
+
+# Keyed on the model object, so results never outlive a replaced or evicted model
+
+@lru_cache(maxsize=256)
+def _cached_fba(model, fingerprint):
+    """FBA keyed by model and bounds. Caller must hold the model's model_lock."""
+    # slim_optimize skips building a full Solution; NaN when the LP is not optimal
+    objective = model.slim_optimize(error_value=float('nan'))
+    status = model.solver.status
+    objective_value = None if np.isnan(objective) else float(objective)
+    fluxes_sample = sample_fluxes(model, model.reactions[:10]) if status == 'optimal' else ()
+    return status, objective_value, fluxes_sample
+
+def sample_fluxes(model, reactions):
+    """Net fluxes (forward minus reverse variable) of a few reactions after a solve.
+
+    On Gurobi the optlang problem is a persistent gurobipy.Model, so read X
+    for just these variables in one call instead of fetching every primal.
+    """
+    if interface_to_str(model.problem) == 'gurobi':
+        grb = model.solver.problem
+        names = [name for r in reactions for name in (r.id, r.reverse_id)]
+        values = grb.getAttr('X', [grb.getVarByName(name) for name in names])
+        return tuple(
+            (r.id, float(values[2 * i] - values[2 * i + 1]))
+            for i, r in enumerate(reactions)
+        )
+    
+    primals = model.solver.primal_values
+    return tuple((r.id, float(primals[r.id] - primals[r.reverse_id])) for r in reactions)
+
+@lru_cache(maxsize=256)
+def _cached_fva(model, fingerprint, reaction_ids, fraction_of_optimum, loopless, processes):
+    """FVA keyed by model, bounds and options. Caller must hold the model's model_lock.
+
+    ``processes`` is an Unkeyed: it changes how FVA runs, not its result.
+    The returned DataFrame is shared between requests and must not be mutated.
+    """
+    # FVA is independent per reaction, so cobrapy fans it out over a process pool
+    return flux_variability_analysis(
+        model,
+        reaction_list=[model.reactions.get_by_id(rid) for rid in reaction_ids],
+        loopless=loopless,
+        fraction_of_optimum=fraction_of_optimum,
+        processes=processes.value
+    )
+
+def clear_result_caches():
+    """Drop cached FBA/FVA results after the model cache changes"""
+    _cached_fba.cache_clear()
+    _cached_fva.cache_clear()
+
+def orjson_response(payload, status=200):
+    """JSON response encoded with orjson; NumPy arrays are serialized natively"""
+    return app.response_class(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
+def _pack_ndarray(obj):
+    """msgpack hook: ship NumPy arrays as raw bytes plus dtype/shape"""
+    if isinstance(obj, np.ndarray):
+        return {"__ndarray__": True, "dtype": obj.dtype.str, "shape": list(obj.shape),
+                "data": np.ascontiguousarray(obj).tobytes()}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+def request_params():
+    """Tool parameters from the JSON body, or from the /rpc envelope"""
+    if 'rpc_params' in g:
+        return g.rpc_params
+    return request.json
+
+def respond(payload, status=200):
+    """Encode a tool response as msgpack for /rpc calls, JSON otherwise"""
+    if 'rpc_params' in g:
+        # Float scalars are fluxes or derived from them: send them as float32 too
+        return app.response_class(
+            msgpack.packb(payload, default=_pack_ndarray, use_single_float=True),
+            status=status,
+            mimetype='application/msgpack'
+        )
+    return orjson_response(payload, status)
+
+preload_models(os.environ.get('MCP_PRELOAD_MODELS', '').split(','))
 
 # ============================================================================
 # Health Check & Tool Listing
@@ -42,7 +337,15 @@ def list_tools():
                 "description": "Load a metabolic model into cache",
                 "parameters": {
                     "model_id": {"type": "string", "required": True, "description": "Model identifier (e.g., 'textbook')"},
-                    "model_path": {"type": "string", "required": False, "description": "Path to SBML file"}
+                    "model_path": {"type": "string", "required": False, "description": "Path to SBML file"},
+                    "background": {"type": "boolean", "required": False, "description": "Load in the background and return a job_id to poll at /jobs/<job_id>"}
+                }
+            },
+            {
+                "name": "model_summary_fast",
+                "description": "Count reactions, metabolites and genes in an SBML file without loading it",
+                "parameters": {
+                    "model_path": {"type": "string", "required": True, "description": "Path to SBML file"}
                 }
             },
             {
@@ -72,7 +375,11 @@ def list_tools():
                 "description": "Run Flux Variability Analysis",
                 "parameters": {
                     "model_id": {"type": "string", "required": True},
-                    "reaction_ids": {"type": "array", "required": False, "description": "Specific reactions (default: all)"}
+                    "reaction_ids": {"type": "array", "required": False, "description": "Specific reactions (default: all)"},
+                    "fraction_of_optimum": {"type": "number", "required": False, "description": "Fraction of optimal objective to maintain (default: 1.0)"},
+                    "loopless": {"type": "boolean", "required": False, "description": "Run loopless FVA (default: false)"},
+                    "processes": {"type": "integer", "required": False, "description": "Worker processes (default: 1 below 200 items, else CPU count - 1)"},
+                    "stream": {"type": "boolean", "required": False, "description": "Stream one NDJSON row per reaction (default: false)"}
                 }
             },
             {
@@ -82,6 +389,15 @@ def list_tools():
                     "model_id": {"type": "string", "required": True},
                     "gene_id": {"type": "string", "required": True}
                 }
+            },
+            {
+                "name": "batch_gene_knockout",
+                "description": "Simulate single knockouts for many genes in one call",
+                "parameters": {
+                    "model_id": {"type": "string", "required": True},
+                    "gene_ids": {"type": "array", "required": True},
+                    "processes": {"type": "integer", "required": False, "description": "Worker processes (default: 1 below 200 items, else CPU count - 1)"}
+                }
             }
         ]
     })
@@ -94,68 +410,151 @@ def list_tools():
 def load_model_endpoint():
     """Load a model into cache"""
     try:
-        data = request.json
+        data = request_params()
         model_id = data.get('model_id')
         model_path = data.get('model_path')
         
         if not model_id:
-            return jsonify({"error": "model_id required"}), 400
+            return respond({"error": "model_id required"}, 400)
         
-        # Load model
-        if model_path:
-            if not os.path.exists(model_path):
-                return jsonify({"error": f"Model file not found: {model_path}"}), 404
-            model = read_sbml_model(model_path)
-        else:
-            # Try to load built-in model
-            model = load_model(model_id)
+        # Short-circuit sources that just failed (load_model may hit the network)
+        source = model_path or model_id
+        with _failed_loads_lock:
+            failure = _failed_loads.get(source)
+        if failure is not None:
+            return respond({"error": failure}, 500)
+        
+        if model_path and not os.path.exists(model_path):
+            return respond({"error": f"Model file not found: {model_path}"}, 404)
+        
+        # Large SBML files take seconds to parse; don't hold the request thread
+        if data.get('background'):
+            job_id = uuid.uuid4().hex
+            future = load_executor.submit(load_and_cache, model_id, model_path)
+            with _load_jobs_lock:
+                load_jobs[job_id] = (model_id, future)
+            return respond({
+                "success": True,
+                "job_id": job_id,
+                "model_id": model_id,
+                "status": "pending"
+            }, 202)
         
-        # Cache it
-        model_cache[model_id] = model
+        # Load model (SBML file, or built-in model by id) and cache it
+        meta = cache_model(model_id, read_model(model_id, model_path))
         
-        return jsonify({
+        return respond({
             "success": True,
             "model_id": model_id,
-            "model_name": model.name,
-            "reactions": len(model.reactions),
-            "metabolites": len(model.metabolites),
-            "genes": len(model.genes),
-            "compartments": list(model.compartments.keys())
+            "model_name": meta["name"],
+            "reactions": meta["reactions"],
+            "metabolites": meta["metabolites"],
+            "genes": meta["genes"],
+            "compartments": meta["compartments"]
         })
     
     except Exception as e:
-        return jsonify({
-            "error": str(e),
-            "traceback": traceback.format_exc()
-        }), 500
+        error = {"error": str(e)}
+        # Formatting the traceback is costly and exposes server paths; debug only
+        if app.debug or os.environ.get('MCP_DEBUG'):
+            error["traceback"] = traceback.format_exc()
+        return respond(error, 500)
+
+@app.route('/tools/model_summary_fast', methods=['POST'])
+def model_summary_fast():
+    """Summarize an SBML file with libsbml, skipping cobra object construction"""
+    try:
+        data = request_params()
+        model_path = data.get('model_path')
+        
+        if not model_path:
+            return respond({"error": "model_path required"}, 400)
+        
+        if not os.path.exists(model_path):
+            return respond({"error": f"Model file not found: {model_path}"}, 404)
+        
+        document = libsbml.SBMLReader().readSBMLFromFile(model_path)
+        sbml_model = document.getModel()
+        if sbml_model is None:
+            return respond({"error": f"No SBML model found in {model_path}"}, 400)
+        
+        fbc = sbml_model.getPlugin('fbc')
+        
+        return respond({
+            "success": True,
+            "model_id": sbml_model.getId(),
+            "model_name": sbml_model.getName(),
+            "reactions": sbml_model.getNumReactions(),
+            "metabolites": sbml_model.getNumSpecies(),
+            "genes": fbc.getNumGeneProducts() if fbc is not None else 0,
+            "compartments": sbml_model.getNumCompartments()
+        })
+    
+    except Exception as e:
+        return respond({"error": str(e)}, 500)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report a background load; finished jobs are reported once, then forgotten.
+
+    Jobs expire JOB_TTL seconds after submission, whether or not they are polled.
+    """
+    with _load_jobs_lock:
+        job = load_jobs.get(job_id)
+        if job is not None and job[1].done():
+            del load_jobs[job_id]
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    
+    model_id, future = job
+    if not future.done():
+        return jsonify({"job_id": job_id, "model_id": model_id, "status": "pending"})
+    
+    error = future.exception()
+    if error is not None:
+        return jsonify({"job_id": job_id, "model_id": model_id, "status": "failed", "error": str(error)}), 500
+    
+    _, meta = get_cached(model_id)
+    meta = meta or {}
+    return jsonify({
+        "job_id": job_id,
+        "model_id": model_id,
+        "status": "done",
+        "model_name": meta.get("name"),
+        "reactions": meta.get("reactions"),
+        "metabolites": meta.get("metabolites"),
+        "genes": meta.get("genes")
+    })
 
 @app.route('/tools/get_model_stats', methods=['POST'])
 def get_model_stats():
     """Get model statistics"""
     try:
-        data = request.json
+        data = request_params()
         model_id = data.get('model_id')
         
-        if model_id not in model_cache:
-            return jsonify({"error": f"Model '{model_id}' not loaded. Call load_model first."}), 400
+        # Precomputed at load time; no traversal of the cobra model
+        model, meta = get_cached(model_id)
+        if model is None:
+            return respond({"error": f"Model '{model_id}' not loaded. Call load_model first."}, 400)
         
-        model = model_cache[model_id]
-        
-        return jsonify({
-            "model_id": model.id,
-            "model_name": model.name,
+        return respond({
+            "model_id": meta["id"],
+            "model_name": meta["name"],
             "statistics": {
-                "reactions": len(model.reactions),
-                "metabolites": len(model.metabolites),
-                "genes": len(model.genes),
-                "compartments": len(model.compartments)
+                "reactions": meta["reactions"],
+                "metabolites": meta["metabolites"],
+                "genes": meta["genes"],
+                "compartments": len(meta["compartments"])
             },
-            "compartments": list(model.compartments.keys()),
-            "objective": str(model.objective.expression)
+            "compartments": meta["compartments"],
+            "gene_ids": meta["gene_ids"],
+            "objective": meta["objective_str"],
+            "solver": meta["solver"]
         })
     
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return respond({"error": str(e)}, 500)
 
 # ============================================================================
 # Analysis Tools
@@ -165,151 +564,257 @@ def get_model_stats():
 def optimize_model():
     """Run FBA optimization"""
     try:
-        data = request.json
+        data = request_params()
         model_id = data.get('model_id')
         
-        if model_id not in model_cache:
-            return jsonify({"error": f"Model '{model_id}' not loaded"}), 400
+        model, _ = get_cached(model_id)
+        if model is None:
+            return respond({"error": f"Model '{model_id}' not loaded"}, 400)
         
-        model = model_cache[model_id]
-        solution = model.optimize()
+        with model_lock(model_id):
+            status, objective_value, fluxes_sample = _cached_fba(model, bounds_fingerprint(model))
         
-        return jsonify({
+        return respond({
             "success": True,
-            "status": solution.status,
-            "objective_value": float(solution.objective_value) if solution.objective_value else None,
-            "fluxes_sample": {
-                rxn_id: float(flux) 
-                for rxn_id, flux in list(solution.fluxes.items())[:10]
-            } if solution.fluxes is not None else {}
+            "status": status,
+            "objective_value": objective_value,
+            "fluxes_sample": {rxn_id: FLUX_DTYPE(flux) for rxn_id, flux in fluxes_sample}
         })
     
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return respond({"error": str(e)}, 500)
 
 @app.route('/tools/get_reaction_info', methods=['POST'])
 def get_reaction_info():
     """Get information about a specific reaction"""
     try:
-        data = request.json
+        data = request_params()
         model_id = data.get('model_id')
         reaction_id = data.get('reaction_id')
         
-        if model_id not in model_cache:
-            return jsonify({"error": f"Model '{model_id}' not loaded"}), 400
+        model, _ = get_cached(model_id)
+        if model is None:
+            return respond({"error": f"Model '{model_id}' not loaded"}, 400)
         
         if not reaction_id:
-            return jsonify({"error": "reaction_id required"}), 400
-        
-        model = model_cache[model_id]
+            return respond({"error": "reaction_id required"}, 400)
         
-        try:
-            reaction = model.reactions.get_by_id(reaction_id)
-        except KeyError:
-            return jsonify({"error": f"Reaction '{reaction_id}' not found"}), 404
-        
-        return jsonify({
-            "id": reaction.id,
-            "name": reaction.name,
-            "reaction": reaction.reaction,
-            "subsystem": reaction.subsystem,
-            "bounds": {
-                "lower": float(reaction.lower_bound),
-                "upper": float(reaction.upper_bound)
-            },
-            "genes": [g.id for g in reaction.genes],
-            "metabolites": {
-                m.id: float(coeff) 
-                for m, coeff in reaction.metabolites.items()
+        # Knockouts change bounds temporarily; don't read them mid-knockout
+        with model_lock(model_id):
+            try:
+                reaction = model.reactions.get_by_id(reaction_id)
+            except KeyError:
+                return respond({"error": f"Reaction '{reaction_id}' not found"}, 404)
+            
+            info = {
+                "id": reaction.id,
+                "name": reaction.name,
+                "reaction": reaction.reaction,
+                "subsystem": reaction.subsystem,
+                "bounds": {
+                    "lower": float(reaction.lower_bound),
+                    "upper": float(reaction.upper_bound)
+                },
+                "genes": [g.id for g in reaction.genes],
+                # Parallel ids/coeffs arrays; coeffs go to the encoder as one float64 buffer
+                "metabolites": {
+                    "ids": [m.id for m in reaction.metabolites],
+                    "coeffs": np.fromiter(reaction.metabolites.values(), dtype=np.float64,
+                                          count=len(reaction.metabolites))
+                }
             }
-        })
+        
+        return respond(info)
     
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return respond({"error": str(e)}, 500)
 
 @app.route('/tools/run_fva', methods=['POST'])
 def run_fva():
     """Run Flux Variability Analysis"""
     try:
-        data = request.json
+        data = request_params()
         model_id = data.get('model_id')
         reaction_ids = data.get('reaction_ids', None)
         
-        if model_id not in model_cache:
-            return jsonify({"error": f"Model '{model_id}' not loaded"}), 400
-        
-        model = model_cache[model_id]
+        model, _ = get_cached(model_id)
+        if model is None:
+            return respond({"error": f"Model '{model_id}' not loaded"}, 400)
         
         # Get reactions to analyze
         if reaction_ids:
-            reactions = [model.reactions.get_by_id(rid) for rid in reaction_ids]
+            reaction_ids = tuple(reaction_ids)
         else:
-            reactions = model.reactions[:10]  # Limit to first 10 for demo
+            reaction_ids = tuple(r.id for r in model.reactions[:10])  # Limit to first 10 for demo
         
-        fva_result = flux_variability_analysis(model, reactions)
+        try:
+            processes = parse_processes(data, len(reaction_ids))
+        except ValueError as e:
+            return respond({"error": str(e)}, 400)
         
-        # Convert to dict
-        result_dict = {
-            index: {
-                "minimum": float(row['minimum']),
-                "maximum": float(row['maximum'])
-            }
-            for index, row in fva_result.iterrows()
-        }
+        with model_lock(model_id):
+            fva_result = _cached_fva(
+                model,
+                bounds_fingerprint(model),
+                reaction_ids,
+                float(data.get('fraction_of_optimum', 1.0)),
+                bool(data.get('loopless', False)),
+                Unkeyed(processes)
+            )
         
-        return jsonify({
+        if data.get('stream') and 'rpc_params' not in g:
+            # One NDJSON row per reaction; the encoded body is never held in memory whole
+            def generate():
+                for rxn_id, minimum, maximum in fva_result.itertuples(index=True, name=None):
+                    yield orjson.dumps(
+                        {"id": rxn_id, "minimum": FLUX_DTYPE(minimum), "maximum": FLUX_DTYPE(maximum)},
+                        option=orjson.OPT_SERIALIZE_NUMPY
+                    ) + b"\n"
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        # Parallel arrays straight from the DataFrame columns; encoded in C by orjson/msgpack
+        return respond({
             "success": True,
-            "reactions_analyzed": len(result_dict),
-            "results": result_dict
+            "reactions_analyzed": len(fva_result),
+            "results": {
+                "ids": fva_result.index.tolist(),
+                "minimum": np.ascontiguousarray(fva_result['minimum'].to_numpy(dtype=FLUX_DTYPE)),
+                "maximum": np.ascontiguousarray(fva_result['maximum'].to_numpy(dtype=FLUX_DTYPE))
+            }
         })
     
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return respond({"error": str(e)}, 500)
 
 @app.route('/tools/gene_knockout', methods=['POST'])
 def gene_knockout():
     """Simulate gene knockout"""
     try:
-        data = request.json
+        data = request_params()
         model_id = data.get('model_id')
         gene_id = data.get('gene_id')
         
-        if model_id not in model_cache:
-            return jsonify({"error": f"Model '{model_id}' not loaded"}), 400
+        model, _ = get_cached(model_id)
+        if model is None:
+            return respond({"error": f"Model '{model_id}' not loaded"}, 400)
         
         if not gene_id:
-            return jsonify({"error": "gene_id required"}), 400
+            return respond({"error": "gene_id required"}, 400)
         
-        model = model_cache[model_id]
+        with model_lock(model_id):
+            # Wild-type growth (shared with optimize_model through the FBA cache)
+            wt_growth = _cached_fba(model, bounds_fingerprint(model))[1] or 0
         
-        # Wild-type growth
-        wt_solution = model.optimize()
-        wt_growth = float(wt_solution.objective_value) if wt_solution.objective_value else 0
-        
-        # Knockout
-        with model:
-            try:
-                gene = model.genes.get_by_id(gene_id)
-                gene.knock_out()
-                ko_solution = model.optimize()
-                ko_growth = float(ko_solution.objective_value) if ko_solution.objective_value else 0
+            # Knockout
+            with model:
+                try:
+                    gene = model.genes.get_by_id(gene_id)
+                    gene.knock_out()
+                    # Objective only; NaN (no growth) if the knockout leaves the LP infeasible
+                    ko_objective = model.slim_optimize(error_value=float('nan'))
+                    ko_growth = 0 if np.isnan(ko_objective) else float(ko_objective)
                 
-                return jsonify({
-                    "success": True,
-                    "gene_id": gene_id,
-                    "wildtype_growth": wt_growth,
-                    "knockout_growth": ko_growth,
-                    "growth_reduction": wt_growth - ko_growth,
-                    "growth_reduction_percent": 100 * (wt_growth - ko_growth) / wt_growth if wt_growth > 0 else 0,
-                    "essential": ko_growth < 0.01,
-                    "knockout_status": ko_solution.status
-                })
+                    return respond({
+                        "success": True,
+                        "gene_id": gene_id,
+                        "wildtype_growth": wt_growth,
+                        "knockout_growth": ko_growth,
+                        "growth_reduction": wt_growth - ko_growth,
+                        "growth_reduction_percent": 100 * (wt_growth - ko_growth) / wt_growth if wt_growth > 0 else 0,
+                        "essential": ko_growth < 0.01,
+                        "knockout_status": model.solver.status
+                    })
             
-            except KeyError:
-                return jsonify({"error": f"Gene '{gene_id}' not found in model"}), 404
+                except KeyError:
+                    return respond({"error": f"Gene '{gene_id}' not found in model"}, 404)
+    
+    except Exception as e:
+        return respond({"error": str(e)}, 500)
+
+@app.route('/tools/batch_gene_knockout', methods=['POST'])
+def batch_gene_knockout():
+    """Simulate single gene knockouts for a list of genes"""
+    try:
+        data = request_params()
+        model_id = data.get('model_id')
+        gene_ids = data.get('gene_ids')
+        
+        model, _ = get_cached(model_id)
+        if model is None:
+            return respond({"error": f"Model '{model_id}' not loaded"}, 400)
+        
+        if not gene_ids:
+            return respond({"error": "gene_ids required"}, 400)
+        
+        if not isinstance(gene_ids, list) or not all(isinstance(gid, str) for gid in gene_ids):
+            return respond({"error": "gene_ids must be a list of gene id strings"}, 400)
+        
+        try:
+            processes = parse_processes(data, len(gene_ids))
+        except ValueError as e:
+            return respond({"error": str(e)}, 400)
+        
+        missing = [gid for gid in gene_ids if gid not in model.genes]
+        if missing:
+            return respond({"error": f"Genes not found in model: {', '.join(missing)}"}, 404)
+        
+        with model_lock(model_id):
+            wt_growth = _cached_fba(model, bounds_fingerprint(model))[1] or 0
+            # All knockouts in one cobrapy call, spread over a process pool
+            deletions = single_gene_deletion(model, gene_list=gene_ids, processes=processes)
+        
+        results = {}
+        for ids, growth, status in zip(deletions['ids'], deletions['growth'], deletions['status']):
+            ko_growth = float(growth) if growth == growth and growth else 0  # NaN when infeasible
+            results[next(iter(ids))] = {
+                "knockout_growth": ko_growth,
+                "growth_reduction_percent": 100 * (wt_growth - ko_growth) / wt_growth if wt_growth > 0 else 0,
+                "essential": ko_growth < 0.01,
+                "knockout_status": status
+            }
+        
+        return respond({
+            "success": True,
+            "wildtype_growth": wt_growth,
+            "genes_tested": len(results),
+            "results": results
+        })
     
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return respond({"error": str(e)}, 500)
+
+# ============================================================================
+# Binary RPC (msgpack)
+# ============================================================================
+
+RPC_TOOLS = {
+    "load_model": load_model_endpoint,
+    "model_summary_fast": model_summary_fast,
+    "get_model_stats": get_model_stats,
+    "optimize_model": optimize_model,
+    "get_reaction_info": get_reaction_info,
+    "run_fva": run_fva,
+    "gene_knockout": gene_knockout,
+    "batch_gene_knockout": batch_gene_knockout
+}
+
+@app.route('/rpc', methods=['POST'])
+def rpc():
+    """Call a tool with a msgpack envelope: {"tool": name, "params": {...}}"""
+    # Set first so errors below are also answered in msgpack
+    g.rpc_params = {}
+    try:
+        call = msgpack.unpackb(request.get_data())
+    except Exception as e:
+        return respond({"error": f"Invalid msgpack body: {e}"}, 400)
+    
+    tool = RPC_TOOLS.get(call.get('tool')) if isinstance(call, dict) else None
+    if tool is None:
+        return respond({"error": "Unknown or missing tool"}, 404)
+    
+    g.rpc_params = call.get('params') or {}
+    return tool()
 
 # ============================================================================
 # Utility Endpoints
@@ -320,25 +825,30 @@ def list_cached_models():
     """List all cached models"""
     models_info = []
     
-    for model_id, model in model_cache.items():
+    # Loads and evictions on other threads resize model_meta; iterate a snapshot
+    with model_cache.lock:
+        cached = list(model_meta.items())
+    
+    for model_id, meta in cached:
         models_info.append({
             "model_id": model_id,
-            "name": model.name,
-            "reactions": len(model.reactions),
-            "metabolites": len(model.metabolites),
-            "genes": len(model.genes)
+            "name": meta["name"],
+            "reactions": meta["reactions"],
+            "metabolites": meta["metabolites"],
+            "genes": meta["genes"]
         })
     
     return jsonify({
         "cached_models": len(model_cache),
+        "capacity": model_cache.maxsize,
+        "evicted_count": model_cache.evicted_count,
         "models": models_info
     })
 
 @app.route('/models/<model_id>', methods=['DELETE'])
 def delete_cached_model(model_id):
     """Remove model from cache"""
-    if model_id in model_cache:
-        del model_cache[model_id]
+    if uncache_model(model_id):
         return jsonify({"success": True, "message": f"Model '{model_id}' removed from cache"})
     else:
         return jsonify({"error": f"Model '{model_id}' not in cache"}), 404
@@ -368,12 +878,17 @@ if __name__ == '__main__':
     print("  GET  /tools               - List available tools")
     print("  GET  /models              - List cached models")
     print("  POST /tools/load_model    - Load a model")
+    print("  GET  /jobs/<job_id>       - Poll a background model load")
+    print("  POST /tools/model_summary_fast - Count SBML contents without loading")
     print("  POST /tools/optimize_model - Run FBA")
     print("  POST /tools/get_model_stats - Get model statistics")
     print("  POST /tools/get_reaction_info - Get reaction details")
     print("  POST /tools/run_fva       - Run FVA")
     print("  POST /tools/gene_knockout - Simulate gene knockout")
+    print("  POST /tools/batch_gene_knockout - Knock out many genes at once")
+    print("  POST /rpc                - Call any tool over msgpack")
     print("\nStarting server on http://localhost:5001")
+    print("(development server - use 'gunicorn -c gunicorn_conf.py server:app' for production)")
     print("=" * 60)
     
     app.run(debug=True, host='0.0.0.0', port=5001)
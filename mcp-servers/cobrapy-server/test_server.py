@@ -9,6 +9,8 @@ Date: 2026-01-28
 
 import requests
 import json
+import os
+import msgpack
 import time
 import sys
 
@@ -21,7 +23,12 @@ def print_response(title, response):
     print(f"{'='*60}")
     print(f"Status: {response.status_code}")
     try:
-        print(json.dumps(response.json(), indent=2))
+        if response.headers.get("Content-Type", "").startswith("application/msgpack"):
+            body = msgpack.unpackb(response.content)
+        else:
+            body = response.json()
+        # Raw array buffers from /rpc are summarized rather than dumped
+        print(json.dumps(body, indent=2, default=lambda b: f"<{len(b)} bytes>"))
     except:
         print(response.text)
 
@@ -32,7 +39,7 @@ def test_server():
     print("="*60)
     
     # 1. Health check
-    print("\n[1/8] Testing health endpoint...")
+    print("\n[1/13] Testing health endpoint...")
     try:
         response = requests.get(f"{BASE_URL}/health", timeout=5)
         print_response("Health Check", response)
@@ -42,12 +49,12 @@ def test_server():
         sys.exit(1)
     
     # 2. List tools
-    print("\n[2/8] Testing tools listing...")
+    print("\n[2/13] Testing tools listing...")
     response = requests.get(f"{BASE_URL}/tools")
     print_response("Available Tools", response)
     
     # 3. Load model
-    print("\n[3/8] Testing model loading...")
+    print("\n[3/13] Testing model loading...")
     response = requests.post(
         f"{BASE_URL}/tools/load_model",
         json={"model_id": "textbook"}
@@ -55,7 +62,7 @@ def test_server():
     print_response("Load Model", response)
     
     # 4. Get model stats
-    print("\n[4/8] Testing model statistics...")
+    print("\n[4/13] Testing model statistics...")
     response = requests.post(
         f"{BASE_URL}/tools/get_model_stats",
         json={"model_id": "textbook"}
@@ -63,7 +70,7 @@ def test_server():
     print_response("Model Statistics", response)
     
     # 5. Optimize model
-    print("\n[5/8] Testing FBA optimization...")
+    print("\n[5/13] Testing FBA optimization...")
     response = requests.post(
         f"{BASE_URL}/tools/optimize_model",
         json={"model_id": "textbook"}
@@ -71,7 +78,7 @@ def test_server():
     print_response("FBA Optimization", response)
     
     # 6. Get reaction info
-    print("\n[6/8] Testing reaction query...")
+    print("\n[6/13] Testing reaction query...")
     response = requests.post(
         f"{BASE_URL}/tools/get_reaction_info",
         json={"model_id": "textbook", "reaction_id": "PFK"}
@@ -79,7 +86,7 @@ def test_server():
     print_response("Reaction Info (PFK)", response)
     
     # 7. Run FVA
-    print("\n[7/8] Testing Flux Variability Analysis...")
+    print("\n[7/13] Testing Flux Variability Analysis...")
     response = requests.post(
         f"{BASE_URL}/tools/run_fva",
         json={"model_id": "textbook"}
@@ -87,13 +94,71 @@ def test_server():
     print_response("FVA Results", response)
     
     # 8. Gene knockout
-    print("\n[8/8] Testing gene knockout simulation...")
+    print("\n[8/13] Testing gene knockout simulation...")
     response = requests.post(
         f"{BASE_URL}/tools/gene_knockout",
         json={"model_id": "textbook", "gene_id": "b0008"}
     )
     print_response("Gene Knockout (b0008)", response)
     
+    # 9. Batch gene knockout
+    print("\n[9/13] Testing batch gene knockout...")
+    response = requests.post(
+        f"{BASE_URL}/tools/batch_gene_knockout",
+        json={"model_id": "textbook", "gene_ids": ["b0008", "b0116", "b0720"]}
+    )
+    print_response("Batch Gene Knockout", response)
+    
+    # 10. Binary RPC
+    print("\n[10/13] Testing msgpack RPC transport...")
+    response = requests.post(
+        f"{BASE_URL}/rpc",
+        data=msgpack.packb({"tool": "run_fva", "params": {"model_id": "textbook"}}),
+        headers={"Content-Type": "application/msgpack"}
+    )
+    print_response("FVA over /rpc (msgpack)", response)
+    
+    # 11. Streaming FVA
+    print("\n[11/13] Testing streamed (NDJSON) FVA...")
+    with requests.post(
+        f"{BASE_URL}/tools/run_fva",
+        json={"model_id": "textbook", "stream": True},
+        stream=True
+    ) as response:
+        print(f"Status: {response.status_code} ({response.headers.get('Content-Type')})")
+        for line in response.iter_lines():
+            if line:
+                print(f"  {json.loads(line)}")
+    
+    # 12. Background load
+    print("\n[12/13] Testing background model loading...")
+    response = requests.post(
+        f"{BASE_URL}/tools/load_model",
+        json={"model_id": "textbook", "background": True}
+    )
+    print_response("Background Load (202 Accepted)", response)
+    job_url = f"{BASE_URL}/jobs/{response.json()['job_id']}"
+    for _ in range(60):
+        response = requests.get(job_url)
+        if response.json().get("status") != "pending":
+            break
+        time.sleep(0.5)
+    print_response("Job Status", response)
+    response = requests.get(job_url)
+    print_response("Job Status after completion (expect 404)", response)
+    
+    # 13. Fast SBML summary (needs an SBML file readable by the server)
+    print("\n[13/13] Testing fast SBML summary...")
+    sbml_path = os.environ.get("MCP_TEST_SBML")
+    if sbml_path:
+        response = requests.post(
+            f"{BASE_URL}/tools/model_summary_fast",
+            json={"model_path": sbml_path}
+        )
+        print_response("Model Summary (libsbml)", response)
+    else:
+        print("Skipped: set MCP_TEST_SBML to an SBML file path")
+    
     # Summary
     print("\n" + "="*60)
     print("✓ All tests completed successfully!")
@@ -7,72 +7,138 @@ Author: Atul B Raj
 Date: 2026-01-28
 """
 
+import importlib
+import importlib.util
+import pathlib
+import pickle
 import sys
-import os
 
-# Add parent directory to path
-sys.path.insert(0, os.path.dirname(__file__))
 
-print("=" * 60)
-print("COBRApy MCP Server - Code Validation")
-print("=" * 60)
+def cached_import(module_path, item=None):
+    """Import a module (or one attribute of it) only if not already loaded"""
+    module = sys.modules.get(module_path) or importlib.import_module(module_path)
+    return getattr(module, item) if item else module
+
+
+def load_textbook_model():
+    """Load the textbook model, reusing a pickled copy from earlier runs.
+
+    The cache file is keyed by the cobra version, so upgrading cobra
+    rebuilds it from the bundled model.
+    """
+    cobra = cached_import("cobra")
+    cache_file = (pathlib.Path.home() / ".cache" / "cobrapy-validate"
+                  / f"textbook-{cobra.__version__}.pkl")
+    if cache_file.exists():
+        try:
+            return pickle.loads(cache_file.read_bytes())
+        except Exception:
+            pass  # stale or corrupt cache; rebuild below
+    
+    model = cached_import("cobra.io", "load_model")("textbook")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_bytes(pickle.dumps(model, protocol=5))
+    except OSError:
+        pass  # caching is best-effort (e.g. read-only home)
+    return model
+
+
+EXPECTED_ROUTES = (
+    '/health',
+    '/tools',
+    '/models',
+    '/tools/load_model',
+    '/jobs/<job_id>',
+    '/tools/model_summary_fast',
+    '/tools/optimize_model',
+    '/tools/get_model_stats',
+    '/tools/get_reaction_info',
+    '/tools/run_fva',
+    '/tools/gene_knockout',
+    '/tools/batch_gene_knockout',
+    '/rpc'
+)
+
+# Output is buffered per phase and written with one call instead of one
+# print (lock + write) per line; error paths print directly
+_buf = []
+emit = _buf.append
+
+
+def flush_phase():
+    """Write the lines buffered by the current phase"""
+    if _buf:
+        sys.stdout.write("\n".join(map(str, _buf)) + "\n")
+        _buf.clear()
+
+
+emit("=" * 60)
+emit("COBRApy MCP Server - Code Validation")
+emit("=" * 60)
+flush_phase()
 
 try:
-    print("\n[1/5] Importing dependencies...")
-    import flask
-    import cobra
-    print("✓ Flask and COBRApy imported successfully")
+    # Heavy imports (cobra pulls in optlang, pandas, scipy...) are deferred
+    # to the step that needs them
+    emit("\n[1/5] Importing dependencies...")
+    flask = cached_import("flask")
+    emit("✓ Flask imported successfully")
+    flush_phase()
     
-    print("\n[2/5] Loading server module...")
-    import server
-    print("✓ Server module loaded successfully")
+    emit("\n[2/5] Loading server module...")
+    # Load server.py by path rather than adding this directory to sys.path
+    # for every later import
+    spec = importlib.util.spec_from_file_location("server", pathlib.Path(__file__).with_name("server.py"))
+    server = importlib.util.module_from_spec(spec)
+    sys.modules["server"] = server
+    spec.loader.exec_module(server)
+    emit("✓ Server module loaded successfully")
+    flush_phase()
     
-    print("\n[3/5] Checking Flask app...")
+    emit("\n[3/5] Checking Flask app...")
     assert server.app is not None
-    print("✓ Flask app created")
+    emit("✓ Flask app created")
+    flush_phase()
     
-    print("\n[4/5] Verifying endpoints...")
-    routes = [rule.rule for rule in server.app.url_map.iter_rules()]
-    expected_routes = [
-        '/health',
-        '/tools',
-        '/models',
-        '/tools/load_model',
-        '/tools/optimize_model',
-        '/tools/get_model_stats',
-        '/tools/get_reaction_info',
-        '/tools/run_fva',
-        '/tools/gene_knockout'
-    ]
+    emit("\n[4/5] Verifying endpoints...")
+    # One pass over the Werkzeug rule map; membership checks are then O(1)
+    routes = frozenset(rule.rule for rule in server.app.url_map.iter_rules())
     
-    for route in expected_routes:
+    for route in EXPECTED_ROUTES:
         if route in routes:
-            print(f"  ✓ {route}")
+            emit(f"  ✓ {route}")
         else:
-            print(f"  ✗ {route} - MISSING!")
+            emit(f"  ✗ {route} - MISSING!")
+    flush_phase()
     
-    print("\n[5/5] Testing COBRApy functionality...")
-    model = cobra.io.load_model("textbook")
-    print(f"  ✓ Loaded model: {len(model.reactions)} reactions")
+    emit("\n[5/5] Testing COBRApy functionality...")
+    model = load_textbook_model()
+    emit(f"  ✓ Loaded model: {len(model.reactions)} reactions")
     
+    # Also confirms a cached model still solves
     solution = model.optimize()
-    print(f"  ✓ FBA optimization: {solution.objective_value:.3f}")
+    emit(f"  ✓ FBA optimization: {solution.objective_value:.3f}")
+    flush_phase()
     
-    print("\n" + "=" * 60)
-    print("✓ All validations passed!")
-    print("=" * 60)
-    print("\nServer code is working correctly.")
-    print("To run the server: python server.py")
-    print("To test with requests: python test_server.py (after starting server)")
-    print("To see workflow examples: python example_workflow.py (after starting server)")
+    emit("\n" + "=" * 60)
+    emit("✓ All validations passed!")
+    emit("=" * 60)
+    emit("\nServer code is working correctly.")
+    emit("To run the server: python server.py")
+    emit("To test with requests: python test_server.py (after starting server)")
+    emit("To see workflow examples: python example_workflow.py (after starting server)")
+    flush_phase()
     
 except ImportError as e:
+    flush_phase()
     print(f"\n✗ Import error: {e}")
     print("\nMake sure you have all dependencies installed:")
     print("  pip install -r requirements.txt")
     sys.exit(1)
     
 except Exception as e:
+    flush_phase()
     print(f"\n✗ Validation failed: {e}")
     import traceback
     traceback.print_exc()